@@ -2,27 +2,118 @@
 Commands, arguments, and parsers
 """
 
-from argparse import ArgumentParser, Namespace, ArgumentTypeError
-from os.path import isdir
+from argparse import ArgumentParser, Namespace, Action
+from sys import argv
+from typing import Optional, Sequence, Union, List, Dict
 
+from bobs.types import Any_
 
-def dir_path(path: str) -> str:
+SUBCOMMANDS = ('scan', 'monitor')
+TARGETS = ('blocks', 'mempool')
+CANDIDATES = ('block', 'blockv3', 'tx', 'txv2', 'txv3')
+# Options that take a value, mapped to their destination, as handled by parse_fast()
+OPTIONS = {'-f': 'filter', '--filter': 'filter',
+           '-t': 'target', '--target': 'target',
+           '-c': 'candidate', '--candidate': 'candidate',
+           '-fmt': 'format', '--format': 'format',
+           '-se': 'settings', '--settings': 'settings',
+           '-fa': 'favorite', '--favorite': 'favorite'}
+SCAN_OPTIONS = {'-s': 'start', '--start': 'start',
+                '-e': 'end', '--end': 'end'}
+
+
+class AppendInPlace(Action):
     """
-    Check given path actually corresponds to a directory
+    Like argparse `append` action, but append to the same list instead of copying it each time,
+    which is quadratic in the number of times the option is given.
     """
-    if isdir(path):
-        return path
-    raise ArgumentTypeError(f"{path} is not a valid path")
+
+    def __call__(self,
+                 parser: ArgumentParser,
+                 namespace: Namespace,
+                 values: Union[str, Sequence[Any_], None],
+                 option_string: Optional[str] = None) -> None:
+        items: Optional[List[Any_]] = getattr(namespace, self.dest, None)
+        if items is None or items is self.default:
+            # Never mutate the default
+            items = list(items) if items else []
+            setattr(namespace, self.dest, items)
+        items.append(values)
+
+
+def parse_fast(args: Sequence[str]) -> Optional[Namespace]:
+    """
+    Hand-rolled parser for plain command lines, it avoids building the whole argparse parser.
+    Return None for anything it doesn't handle (help, abbreviations, invalid values, etc.),
+    in that case the argparse parser from get_parser() should be used instead.
+
+    >>> parse_fast(['-dd', '-f', 'coinbase', 'scan', '-s', '-10'])  # doctest: +NORMALIZE_WHITESPACE
+    Namespace(filter=['coinbase'], details=2, target='blocks', candidate='txv3', format='fancy_grid',
+              settings=None, favorite='', start=-10, end=0)
+    >>> parse_fast(['--help']) is None
+    True
+    """
+    values: Dict[str, Any_] = {'filter': [], 'details': None, 'target': 'blocks', 'candidate': 'txv3',
+                               'format': 'fancy_grid', 'settings': None, 'favorite': ''}
+    options = OPTIONS
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if options is OPTIONS and arg in SUBCOMMANDS:
+            if arg == 'scan':
+                values.update(start=None, end=0)
+                options = SCAN_OPTIONS
+            else:
+                # Monitor has no options
+                options = {}
+            i += 1
+            continue
+        if options is OPTIONS and (arg == '--details' or (len(arg) > 1 and arg.strip('d') == '-')):
+            # -d, -dd, -ddd, etc.
+            values['details'] = (values['details'] or 0) + (1 if arg == '--details' else len(arg) - 1)
+            i += 1
+            continue
+        if arg not in options or i + 1 == len(args):
+            return None
+        dest, value = options[arg], args[i + 1]
+        if value.startswith('-') and not value[1:].isdigit():
+            # Argparse would consider it an option
+            return None
+        if dest == 'filter':
+            values[dest].append(value)
+        elif dest in ('start', 'end'):
+            try:
+                values[dest] = int(value)
+            except ValueError:
+                return None
+        elif (dest == 'target' and value not in TARGETS) or (dest == 'candidate' and value not in CANDIDATES):
+            return None
+        else:
+            values[dest] = value
+        i += 2
+    return Namespace(**values)
 
 
 def get_args() -> Namespace:
     """
     Parse and return command line arguments.
+    Common command lines are parsed by parse_fast(), the full argparse parser is used for everything else.
+    """
+    args = argv[1:]
+    namespace = parse_fast(args)
+    if namespace is not None:
+        return namespace
+    return get_parser().parse_args(args)
+
+
+def get_parser() -> ArgumentParser:
+    """
+    Return the command line arguments parser.
     """
     parser = ArgumentParser(description='A Bitcoin observatory to monitor and scan given customizable filters')
     parser.add_argument('-f',
                         '--filter',
-                        action='append',
+                        action=AppendInPlace,
                         type=str,
                         default=[],
                         help="The name of the filter to use (it has to be declared in settings.toml),"
@@ -34,13 +125,13 @@ def get_args() -> Namespace:
     parser.add_argument('-t',
                         '--target',
                         type=str,
-                        choices=['blocks', 'mempool'],
+                        choices=TARGETS,
                         default='blocks',
                         help='What structure to look at, default is `blocks`')
     parser.add_argument('-c',
                         '--candidate',
                         type=str,
-                        choices=['block', 'blockv3', 'tx', 'txv2', 'txv3'],
+                        choices=CANDIDATES,
                         default='txv3',
                         help='The object to compare against the criteria')
     parser.add_argument('-fmt',
@@ -50,7 +141,7 @@ def get_args() -> Namespace:
                         help="Format to pass to tabulate() for table formatting. (default 'fancy_grid')")
     parser.add_argument('-se',
                         '--settings',
-                        type=dir_path,
+                        type=str,
                         help="Path to settings.toml file, default is current directory. If file not present, create it")
     parser.add_argument('-fa',
                         '--favorite',
@@ -76,4 +167,4 @@ def get_args() -> Namespace:
     parser_scan = subparsers.add_parser('monitor',
                                         description='Monitor new coming data using given filters',
                                         help='Monitor new coming data using given filter, currently not implemented')
-    return parser.parse_args()
+    return parser
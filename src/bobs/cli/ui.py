@@ -1,13 +1,18 @@
 """
 Functions and utilities to manage the command line interface
 """
+# `tabulate` is imported lazily inside the table functions, so that CLI paths
+# which never print a table don't pay for it.
+# pylint: disable=import-outside-toplevel
 
 from sys import argv
-from typing import Iterable, Sequence
+from typing import Iterable, Sequence, TYPE_CHECKING, Tuple
 
-from bobs.obs.candidates import TransactionV3, Transaction
-from bobs.types import Filter
-from tabulate import tabulate
+from bobs.types import Filter, RawData, Any_
+
+if TYPE_CHECKING:
+    # Only used for type-hinting, avoid importing the candidates stack at runtime
+    from bobs.obs.candidates import TransactionV3, Transaction
 
 HEADERS_TXID_TABLE = ('txid',)
 HEADERS_BASE_TABLE = ('txid', 'height', 'date')
@@ -15,8 +20,7 @@ HEADERS_DETAILED_TABLE = ('txid', 'version', 'size', 'vsize', 'weight', 'locktim
                           'abs fee', 'rel fee', 'height', 'date')
 HEADERS_INPUTS_TABLE = ('txid', 'height', 'value', 'vout', 'address', 'type', 'sequence')
 HEADERS_OUTPUTS_TABLE = ('value', 'vout', 'address', 'type')
-HEADERS_FULL_DETAIL_TABLE = ('txid', 'version', 'size', 'vsize', 'weight', 'locktime',
-                             'abs fee', 'rel fee', 'height', 'date')
+HEADERS_FULL_DETAIL_TABLE = HEADERS_DETAILED_TABLE
 
 
 def print_error(title: str, message: str) -> None:
@@ -35,7 +39,7 @@ def print_greetings(filters: Iterable[Filter]) -> None:
     print(f'Full command used: {" ".join(argv)}\n')
 
 
-def print_result(txs: Sequence[TransactionV3],
+def print_result(txs: Sequence['TransactionV3'],
                  details: int,
                  stats: bool = False,  # TODO
                  fmt: str = 'fancy_grid') -> None:
@@ -69,6 +73,7 @@ def base_table(txs: Iterable, fmt: str) -> str:
     """
     Return a table with basic information about each transaction.
     """
+    from tabulate import tabulate
     return tabulate(((tx.txid, tx.height, tx.date) for tx in txs),
                     headers=HEADERS_BASE_TABLE,
                     tablefmt=fmt)
@@ -78,48 +83,71 @@ def detailed_table(txs: Iterable, fmt: str) -> str:
     """
     Return a table with most of the details of each transaction.
     """
+    from tabulate import tabulate
     return tabulate(((tx.txid, tx.version, tx.size, tx.vsize, tx.weight,
                       tx.locktime, tx.abs_fee, tx.rel_fee, tx.height, tx.date) for tx in txs),
                     headers=HEADERS_DETAILED_TABLE,
                     tablefmt=fmt)
 
 
-def inputs_table(tx: TransactionV3, fmt: str) -> str:
+def input_row(tx_input: RawData) -> Tuple[Any_, ...]:
+    """
+    Return a row of the inputs table for a non-coinbase input.
+    """
+    prevout = tx_input['prevout']
+    script_pubkey = prevout['scriptPubKey']
+    return (tx_input['txid'], prevout['height'], prevout['value'], tx_input['vout'],
+            script_pubkey['address'], script_pubkey['type'], tx_input['sequence'])
+
+
+def output_row(tx_output: RawData) -> Tuple[Any_, ...]:
+    """
+    Return a row of the outputs table.
+    """
+    script_pubkey = tx_output['scriptPubKey']
+    return tx_output['value'], tx_output['n'], script_pubkey.get('address', ''), script_pubkey['type']
+
+
+def inputs_table(tx: 'TransactionV3', fmt: str) -> str:
     """
     Return table with all transaction inputs information.
     """
+    from tabulate import tabulate
     if tx.is_coinbase:
         return tabulate(((None, None, None, None, None, None, tx_input['sequence']) for tx_input in tx.inputs),
                         headers=HEADERS_INPUTS_TABLE,
                         tablefmt=fmt)
-    return tabulate(((tx_input['txid'], tx_input['prevout']['height'], tx_input['prevout']['value'],
-                      tx_input['vout'], tx_input['prevout']['scriptPubKey']['address'],
-                      tx_input['prevout']['scriptPubKey']['type'], tx_input['sequence']) for tx_input in tx.inputs),
+    return tabulate(map(input_row, tx.inputs),
                     headers=HEADERS_INPUTS_TABLE,
                     tablefmt=fmt)
 
 
-def outputs_table(tx: Transaction, fmt: str) -> str:
+def outputs_table(tx: 'Transaction', fmt: str) -> str:
     """
     Return table with all transaction inputs information.
     """
-    return tabulate(((tx_output['value'], tx_output['n'], tx_output['scriptPubKey'].get('address', ''),
-                      tx_output['scriptPubKey']['type']) for tx_output in tx.outputs),
+    from tabulate import tabulate
+    return tabulate(map(output_row, tx.outputs),
                     headers=HEADERS_OUTPUTS_TABLE,
                     tablefmt=fmt)
 
 
-def full_detail_table(txs: Iterable[TransactionV3], fmt: str) -> None:
+def full_detail_table(txs: Sequence['TransactionV3'], fmt: str) -> None:
     """
-    Print multiple tables with all the details of each transaction plus inputs and outputs information.
+    Print a summary table with all the details of each transaction, followed by
+    inputs and outputs information for each transaction.
+    The summary table is built in a single `tabulate()` call for all transactions.
     """
+    from tabulate import tabulate
+    print('\n\n\n\n## Transactions\n')
+    print(tabulate([(tx.txid, tx.version, tx.size, tx.vsize, tx.weight,
+                     tx.locktime, tx.abs_fee, tx.rel_fee, tx.height, tx.date) for tx in txs],
+                   headers=HEADERS_FULL_DETAIL_TABLE,
+                   tablefmt=fmt))
     for tx in txs:
-        print('\n\n\n\n## Transaction\n')
-        print(tabulate(((tx.txid, tx.version, tx.size, tx.vsize, tx.weight,
-                         tx.locktime, tx.abs_fee, tx.rel_fee, tx.height, tx.date),),
-                       headers=HEADERS_FULL_DETAIL_TABLE,
-                       tablefmt=fmt))
-        print(f'\n### {tx.n_in} inputs\n')
-        print(inputs_table(tx, fmt))
-        print(f'\n### {tx.n_out} outputs\n')
-        print(outputs_table(tx, fmt))
+        # A single print() per transaction, instead of one per line
+        print(f'\n\n## Transaction {tx.txid}\n'
+              f'\n### {tx.n_in} inputs\n\n'
+              f'{inputs_table(tx, fmt)}\n'
+              f'\n### {tx.n_out} outputs\n\n'
+              f'{outputs_table(tx, fmt)}')
@@ -2,15 +2,23 @@
 Bobs main logic
 """
 
-from bobs.cli.commands import get_args
-from bobs.cli.ui import print_result, print_greetings
-from bobs.obs.scan import scan_blocks, scan_mem
-from bobs.settings import Settings
+from bobs.cli.commands import get_args, get_parser
 
 
 def main() -> None:
     args = get_args()
-    settings = Settings.from_file(args.settings)
+    # Import the observatory stack only after the arguments are parsed,
+    # so `--help` and argument errors don't pay for it.
+    # pylint: disable=import-outside-toplevel
+    from bobs.cli.ui import print_result, print_greetings
+    from bobs.obs.scan import scan_blocks, scan_mem
+    from bobs.settings import Settings
+
+    try:
+        settings = Settings.from_file(args.settings)
+    except ValueError as err:
+        # Same usage error argparse used to give when it validated the directory itself
+        get_parser().error(f'argument -se/--settings: {err}')
     print_greetings(args.filter)
     try:
         filters = [settings['filters'][key] for key in args.filter]
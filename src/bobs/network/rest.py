@@ -6,13 +6,27 @@ from asyncio import sleep
 from enum import Enum
 from typing import Optional, AsyncIterator
 
-from aiohttp import ClientSession, ClientTimeout, ClientResponse
+from aiohttp import ClientSession, ClientTimeout, ClientResponse, TCPConnector
 from bobs.types import RestUriArg, Json
 from orjson import loads
 
 HEADERS = {'User-Agent': 'bobs',
            'content-type': 'application/json'}
-TIMEOUT = 15
+# Timeouts in seconds: whole request, connecting to the server, and between two reads of the response.
+# The connect timeout deliberately excludes waiting for a free connection from the pool.
+TIMEOUT = 30
+CONNECT_TIMEOUT = 2
+READ_TIMEOUT = 15
+# Connection pool of the default session, connections are kept alive and reused across requests
+CONNECTIONS_LIMIT = 64
+CONNECTIONS_LIMIT_PER_HOST = 32
+KEEPALIVE_TIMEOUT = 75
+# Seconds to cache DNS resolution of the endpoint host, it doesn't change during a scan
+DNS_CACHE_TTL = 300
+# Seconds to wait for the underlying SSL connections to close, see Rest.close()
+SSL_SHUTDOWN_DELAY = 0.25
+# Maximum number of outpoints Bitcoin Core accepts in a single getutxos request
+MAX_GETUTXOS_OUTPOINTS = 15
 
 
 class ReqType(Enum):
@@ -56,11 +70,22 @@ class RestApi(Enum):
     # Return transactions in the mempool
     MEMPOOL_CONTENT = '/mempool/contents'
 
+    def __init__(self, value: str) -> None:
+        # Precompute the most common URI, with no arguments and JSON request type.
+        self._json_uri = f'{value}{ReqType.JSON.value}'
+
     def to_uri(self, req_type: ReqType, *args: RestUriArg) -> str:
         """
         Return complete URI for RestApi.
         """
-        return f"{self.value}{''.join(f'/{arg}' for arg in args)}{req_type.value}"
+        if not args:
+            if req_type is ReqType.JSON:
+                return self._json_uri
+            return f'{self.value}{req_type.value}'
+        if len(args) == 1:
+            # Most requests have a single argument (e.g., a txid or a block hash), skip the join
+            return f'{self.value}/{args[0]}{req_type.value}'
+        return f"{self.value}/{'/'.join(map(str, args))}{req_type.value}"
 
 
 class Rest:
@@ -68,20 +93,30 @@ class Rest:
     Client object to interact with REST server.
     """
 
-    __slots__ = ('_session', '_endpoint')
+    __slots__ = ('_session', '_endpoint', '_base_uri')
 
     def __init__(self,
                  session: Optional[ClientSession] = None,
                  endpoint: str = 'http://127.0.0.1:8332') -> None:
         """
         Initialize asynchronous REST client, if no session is provided,
-        aiohttp.ClientSession() is used. If no `endpoint` is provided,
+        aiohttp.ClientSession() with a keep-alive connection pool is used. If no `endpoint` is provided,
         Bitcoin Core default one is used.
         Can be used with async context manager to cleanly close the session.
         """
-        self._session = session if session else ClientSession(headers=HEADERS,
-                                                              timeout=ClientTimeout(total=TIMEOUT))
+        if not session:
+            session = ClientSession(headers=HEADERS,
+                                    timeout=ClientTimeout(total=TIMEOUT,
+                                                          sock_connect=CONNECT_TIMEOUT,
+                                                          sock_read=READ_TIMEOUT),
+                                    connector=TCPConnector(limit=CONNECTIONS_LIMIT,
+                                                           limit_per_host=CONNECTIONS_LIMIT_PER_HOST,
+                                                           keepalive_timeout=KEEPALIVE_TIMEOUT,
+                                                           ttl_dns_cache=DNS_CACHE_TTL))
+        self._session = session
         self._endpoint = endpoint
+        # Common prefix of every request URI
+        self._base_uri = f'{endpoint}/rest'
 
     async def __aenter__(self) -> 'Rest':
         return self
@@ -93,33 +128,33 @@ class Rest:
     def endpoint(self) -> str:
         return self._endpoint
 
-    def get_uri(self, method: RestApi, *args: RestUriArg) -> str:
+    def get_uri(self, method: RestApi, *args: RestUriArg, req_type: ReqType = ReqType.JSON) -> str:
         """
         Take a RestApi and return complete URI string for GET request.
         """
-        return f'{self._endpoint}/rest{method.to_uri(ReqType.JSON, *args)}'
+        return self._base_uri + method.to_uri(req_type, *args)
 
-    async def get_response(self, method: RestApi, *args: RestUriArg) -> ClientResponse:
+    async def get_response(self, method: RestApi, *args: RestUriArg, req_type: ReqType = ReqType.JSON) -> ClientResponse:
         """
         Perform GET request and return ClientResponse object.
         """
-        response = await self._session.get(self.get_uri(method, *args))
+        response = await self._session.get(self.get_uri(method, *args, req_type=req_type))
         response.raise_for_status()
         return response
 
     async def get_json(self, method: RestApi, *args: RestUriArg) -> Json:
         """
         Return the response body converted to Dict.
+        The raw bytes are given directly to orjson, skipping aiohttp text decoding.
         """
-        json: Json = await (await self.get_response(method, *args)).json(encoding='UTF-8',
-                                                                         loads=loads)
+        json: Json = loads(await (await self.get_response(method, *args)).read())
         return json
 
-    async def get_bytes(self, method: RestApi, *args: RestUriArg) -> bytes:
+    async def get_bytes(self, method: RestApi, *args: RestUriArg, req_type: ReqType = ReqType.JSON) -> bytes:
         """
         Return the response body in bytes.
         """
-        return await (await self.get_response(method, *args)).read()
+        return await (await self.get_response(method, *args, req_type=req_type)).read()
 
     async def get_chunks(self, method: RestApi, *args: RestUriArg, chunk_size: int = 0) -> AsyncIterator[bytes]:
         """
@@ -177,6 +212,7 @@ class Rest:
         """
         Close the async session and wait for graceful shutdown
         https://docs.aiohttp.org/en/stable/client_advanced.html#graceful-shutdown
+        A zero sleep is enough for plain HTTP, only SSL connections need to wait longer.
         """
         await self._session.close()
-        await sleep(0.1)
+        await sleep(SSL_SHUTDOWN_DELAY if self._endpoint.startswith('https') else 0)
@@ -4,17 +4,119 @@ about some raw data.
 """
 
 from collections import Counter
-from datetime import datetime as dt
-from functools import cached_property
-from itertools import starmap, chain
-from operator import attrgetter, itemgetter
-from statistics import median, mean
-from typing import Mapping, Iterator, Counter as Counter_t, Union
+from itertools import chain
+from operator import itemgetter
+from statistics import median, fmean
+from sys import intern
+from typing import Mapping, Iterator, Counter as Counter_t, Union, Tuple, TypeVar, Generic, Callable, Optional, Type, \
+    overload, NamedTuple, List, Dict
 
 from bobs.obs.criteria import Criterion
-from bobs.types import RawData, Any_
+from bobs.types import RawData, Any_, CompiledFilter, ValueGetter
 from orjson import dumps
 
+T = TypeVar('T')
+
+
+class cached_property(Generic[T]):
+    """
+    Lightweight replacement of functools.cached_property, without its per-instance lock (Python < 3.12).
+    The first access stores the value in the instance __dict__, which then shadows this non-data descriptor,
+    so next accesses are a plain attribute lookup.
+    """
+
+    def __init__(self, func: Callable[[Any_], T]) -> None:
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: Type[Any_], name: str) -> None:
+        self.name = name
+
+    @overload
+    def __get__(self, instance: None, owner: Optional[Type[Any_]] = None) -> 'cached_property[T]':
+        ...
+
+    @overload
+    def __get__(self, instance: object, owner: Optional[Type[Any_]] = None) -> T:
+        ...
+
+    def __get__(self, instance: Optional[object], owner: Optional[Type[Any_]] = None) -> Union[T, 'cached_property[T]']:
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
+
+
+def format_timestamp(timestamp: int) -> str:
+    """
+    Return the UTC `timestamp` formatted as '%Y-%m-%d %H:%M'.
+    Only integer arithmetic is used (Howard Hinnant's days_from_civil inverse), which is much cheaper
+    than creating and formatting a datetime object for each candidate.
+
+    >>> format_timestamp(1647800706)
+    '2022-03-20 18:25'
+    >>> format_timestamp(0)
+    '1970-01-01 00:00'
+    """
+    days, seconds = divmod(timestamp, 86400)
+    # Shift the epoch to 0000-03-01, and split in 400 years eras
+    era, day_of_era = divmod(days + 719468, 146097)
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    # Months starting from March
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = shifted_month + 3 if shifted_month < 10 else shifted_month - 9
+    year = era * 400 + year_of_era + (month <= 2)
+    hours, seconds = divmod(seconds, 3600)
+    return f'{year:04d}-{month:02d}-{day:02d} {hours:02d}:{seconds // 60:02d}'
+
+
+class RawDataField:
+    """
+    Descriptor of a well known raw data item, so that accessing it as an attribute doesn't go through the
+    Candidate.__getattr__() fallback. Filters still read it from the raw data, see Candidate.is_attribute().
+    """
+
+    __slots__ = ('key',)
+
+    def __init__(self) -> None:
+        self.key = ''
+
+    def __set_name__(self, owner: Type[Any_], name: str) -> None:
+        self.key = name
+
+    def __get__(self, instance: Optional['Candidate'], owner: Optional[Type[Any_]] = None) -> Any_:
+        if instance is None:
+            return self
+        return instance.raw_data[self.key]
+
+
+def attribute_getter(id_: str) -> ValueGetter:
+    """
+    Return a function which gets the attribute `id_` of a candidate, or the candidate itself if it fails.
+    """
+
+    def get_value(candidate: 'Candidate') -> Any_:
+        try:
+            return getattr(candidate, id_)
+        except (KeyError, AttributeError):
+            return candidate
+
+    return get_value
+
+
+def raw_data_getter(id_: str) -> ValueGetter:
+    """
+    Return a function which gets the raw data item `id_` of a candidate, or the candidate itself if missing.
+    """
+
+    def get_value(candidate: 'Candidate') -> Any_:
+        return candidate.raw_data.get(id_, candidate)
+
+    return get_value
+
 
 class Candidate:
     """
@@ -46,8 +148,32 @@ class Candidate:
     def __call__(self, filter_: Mapping[str, Criterion]) -> bool:
         """
         Return True if the candidate match all criterion in the filter.
+        When matching many candidates, compile the filter once with compile_filter() and use match() instead.
+        """
+        return self.match(self.compile_filter(filter_))
+
+    def match(self, filter_: CompiledFilter) -> bool:
+        """
+        Return True if the candidate match all criterion in the compiled filter.
+        """
+        # Plain loop, this is the hot path of every scan.
+        for get_value, criterion in filter_:
+            if not criterion(get_value(self)):
+                return False
+        return True
+
+    @classmethod
+    def compile_filter(cls, filter_: Mapping[str, Criterion]) -> CompiledFilter:
+        """
+        Resolve once each id_ of the filter to a function which gets the value for the criterion
+        from a candidate of this class, with the same logic as match_criterion():
+        an attribute of the candidate, a raw data item, or else the entire candidate object.
+
+        The order of the filter is kept, earlier criteria can act as guards for the later ones
+        (e.g., when a later value falls back to the entire candidate).
         """
-        return all(starmap(self.match_criterion, filter_.items()))
+        return tuple((attribute_getter(id_) if cls.is_attribute(id_) else raw_data_getter(id_), criterion)
+                     for id_, criterion in filter_.items())
 
     def match_criterion(self, id_: str, criterion: Criterion) -> bool:
         """
@@ -55,17 +181,39 @@ class Candidate:
         The id_ is the identifier of an attribute of the candidate to be used as value. If no such attribute,
         use the entire candidate object.
         """
+        if not self.is_attribute(id_):
+            # Plain raw data item, no need to go through __getattr__ and a KeyError
+            return criterion(self.raw_data.get(id_, self))
         try:
             return criterion(getattr(self, id_))
         except (KeyError, AttributeError):
             return criterion(self)
 
+    @classmethod
+    def is_attribute(cls, id_: str) -> bool:
+        """
+        Return True if `id_` is defined by the class (e.g., a property), rather than being a raw data item.
+        """
+        for class_ in cls.__mro__:
+            if id_ in vars(class_):
+                return not isinstance(vars(class_)[id_], RawDataField)
+        return False
+
 
 class Transaction(Candidate):
     """
     Base candidate for transactions.
     """
 
+    txid = RawDataField()
+    hash = RawDataField()
+    version = RawDataField()
+    size = RawDataField()
+    vsize = RawDataField()
+    weight = RawDataField()
+    locktime = RawDataField()
+    height = RawDataField()
+
     @property
     def inputs(self) -> Iterator[RawData]:
         return iter(self.raw_data['vin'])
@@ -83,14 +231,18 @@ class Transaction(Candidate):
         """
         Yield each output coin value, in bitcoin.
         """
-        return map(itemgetter('value'), self.raw_data['vout'])
+        return iter(self._out_values)
+
+    @cached_property
+    def _out_values(self) -> Tuple[float, ...]:
+        return tuple(tx_output['value'] for tx_output in self.raw_data['vout'])
 
     @cached_property
     def total_out(self) -> float:
         """
         Return sum of all outputs, in bitcoin
         """
-        return round(sum(self.out_values), 8)
+        return round(sum(self._out_values), 8)
 
     @cached_property
     def n_in(self) -> int:
@@ -111,14 +263,27 @@ class Transaction(Candidate):
         """
         Return Counter with value:frequency pairs for output values
         """
-        return Counter(self.out_values)
+        return Counter(self._out_values)
+
+    @cached_property
+    def most_common_out(self) -> Tuple[float, int]:
+        """
+        Return the value:frequency pair of the most common output value.
+        Shared by `n_eq` and `den`, so that the output values are counted and ranked only once.
+        A plain dict and max() are enough, no need for a Counter and its sorting.
+        """
+        histogram: Dict[float, int] = {}
+        get = histogram.get
+        for value in self._out_values:
+            histogram[value] = get(value, 0) + 1
+        return max(histogram.items(), key=itemgetter(1))
 
     @cached_property
     def n_eq(self) -> int:
         """
         Return the frequency of the **most common** equally sized output.
         """
-        return self.out_counter.most_common(1)[0][1]
+        return self.most_common_out[1]
 
     @cached_property
     def den(self) -> float:
@@ -127,32 +292,40 @@ class Transaction(Candidate):
         of the most common equally sized output.
         If no equally sized outputs, return 0
         """
-        return self.out_counter.most_common(1)[0][0] if self.n_eq > 1 else 0
+        value, frequency = self.most_common_out
+        return value if frequency > 1 else 0
 
     @cached_property
     def date(self) -> str:
         """
         Return transaction time in datetime.
         """
-        return dt.utcfromtimestamp(self.raw_data['timestamp_date']).strftime('%Y-%m-%d %H:%M')
+        return format_timestamp(self.raw_data['timestamp_date'])
+
+    @cached_property
+    def _out_addrs(self) -> Tuple[str, ...]:
+        return tuple(tx_output['scriptPubKey'].get('address', '') for tx_output in self.raw_data['vout'])
+
+    @cached_property
+    def _out_types(self) -> Tuple[str, ...]:
+        if self.is_coinbase:
+            return ()
+        # Few distinct script types, interning makes criteria comparisons an identity check
+        return tuple(intern(tx_output['scriptPubKey']['type']) for tx_output in self.raw_data['vout'])
 
     @property
     def out_addrs(self) -> Iterator[str]:
         """
         Yield each output address.
         """
-        for tx_output in self.raw_data['vout']:
-            yield tx_output['scriptPubKey'].get('address', '')
+        return iter(self._out_addrs)
 
     @property
     def out_types(self) -> Iterator[str]:
         """
         Yield each output script type
         """
-        if self.is_coinbase:
-            return
-        for tx_output in self.raw_data['vout']:
-            yield tx_output['scriptPubKey']['type']
+        return iter(self._out_types)
 
 
 class TransactionV3(Transaction):
@@ -160,34 +333,53 @@ class TransactionV3(Transaction):
     Transaction candidate with extra prevout information as returned by getblock verbosity 3
     """
 
+    @cached_property
+    def _prevouts(self) -> Tuple[RawData, ...]:
+        """
+        Return the prevout of each input, coinbase has none.
+        """
+        if self.is_coinbase:
+            return ()
+        return tuple(tx_input['prevout'] for tx_input in self.raw_data['vin'])
+
+    @cached_property
+    def _in_values(self) -> Tuple[float, ...]:
+        return tuple(prevout['value'] for prevout in self._prevouts)
+
+    @cached_property
+    def _in_addrs(self) -> Tuple[str, ...]:
+        return tuple(prevout['scriptPubKey'].get('address', '') for prevout in self._prevouts)
+
+    @cached_property
+    def _in_types(self) -> Tuple[str, ...]:
+        return tuple(intern(prevout['scriptPubKey']['type']) for prevout in self._prevouts)
+
     @property
     def in_values(self) -> Iterator[float]:
         """
         Yield each input coin value, in bitcoin.
         """
-        if self.is_coinbase:
-            return
-        for tx_input in self.raw_data['vin']:
-            yield tx_input['prevout']['value']
+        return iter(self._in_values)
 
     @cached_property
     def total_in(self) -> float:
         """
         Return sum of all inputs, in bitcoin
         """
-        return round(sum(self.in_values), 8)
+        return round(sum(self._in_values), 8)
 
     @cached_property
     def abs_fee(self) -> float:
         """
         Return absolute fee, in bitcoin.
         """
-        try:
-            return self.fee  # type: ignore[no-any-return] # It's from raw data, we assume it's indeed a float
-        except KeyError:
-            if self.is_coinbase:
-                return 0.0
-            return round(self.total_in - self.total_out, 8)
+        # Avoid raising KeyError through __getattr__ for transactions without the fee field
+        fee: Optional[float] = self.raw_data.get('fee')
+        if fee is not None:
+            return fee
+        if self.is_coinbase:
+            return 0.0
+        return round(self.total_in - self.total_out, 8)
 
     @cached_property
     def rel_fee(self) -> float:
@@ -204,17 +396,14 @@ class TransactionV3(Transaction):
         """
         Return Counter with value:frequency pairs for input values
         """
-        return Counter(self.in_values)
+        return Counter(self._in_values)
 
     @property
     def in_addrs(self) -> Iterator[str]:
         """
         Yield each input address.
         """
-        if self.is_coinbase:
-            return
-        for tx_input in self.raw_data['vin']:
-            yield tx_input['prevout']['scriptPubKey'].get('address', '')
+        return iter(self._in_addrs)
 
     @property
     def addresses(self) -> Iterator[str]:
@@ -228,10 +417,7 @@ class TransactionV3(Transaction):
         """
         Yield each input script type
         """
-        if self.is_coinbase:
-            return
-        for tx_input in self.raw_data['vin']:
-            yield tx_input['prevout']['scriptPubKey']['type']
+        return iter(self._in_types)
 
     @property
     def types(self) -> Iterator[str]:
@@ -246,6 +432,12 @@ class Block(Candidate):
     Base candidate for blocks.
     """
 
+    hash = RawDataField()
+    height = RawDataField()
+    time = RawDataField()
+    size = RawDataField()
+    weight = RawDataField()
+
     @property
     def txs(self) -> Iterator[str]:
         """
@@ -255,64 +447,102 @@ class Block(Candidate):
 
     @cached_property
     def date(self) -> str:
-        return dt.utcfromtimestamp(self.raw_data['time']).strftime('%Y-%m-%d %H:%M')
+        return format_timestamp(self.raw_data['time'])
+
+
+class BlockStats(NamedTuple):
+    """
+    Aggregated data about the transactions of a BlockV3.
+    """
+    n_in: int
+    n_out: int
+    abs_fees: Tuple[float, ...]
+    rel_fees: Tuple[float, ...]
+    total_in: float
+    total_out: float
 
 
 class BlockV3(Block):
 
     @property
     def txs(self) -> Iterator[TransactionV3]:  # type: ignore[override] # Intentional
-        return map(TransactionV3, self.raw_data['tx'])
+        return iter(self.tx_list)
+
+    @cached_property
+    def tx_list(self) -> List[TransactionV3]:
+        """
+        Transaction candidates of the block, created only once so that their cached properties are shared.
+        """
+        return list(map(TransactionV3, self.raw_data['tx']))
+
+    @cached_property
+    def stats(self) -> BlockStats:
+        """
+        Compute all the aggregated data in a single pass over the transactions.
+        """
+        n_in = n_out = 0
+        total_in: float = 0
+        total_out: float = 0
+        abs_fees = []
+        rel_fees = []
+        for tx in self.tx_list:
+            n_in += tx.n_in
+            n_out += tx.n_out
+            abs_fees.append(tx.abs_fee)
+            rel_fees.append(tx.rel_fee)
+            total_in += tx.total_in
+            total_out += tx.total_out
+        return BlockStats(n_in, n_out, tuple(abs_fees), tuple(rel_fees), total_in, total_out)
 
     @property
     def n_in(self) -> int:
-        return sum(map(attrgetter('n_in'), self.txs))
+        return self.stats.n_in
 
     @property
     def n_out(self) -> int:
-        return sum(map(attrgetter('n_out'), self.txs))
+        return self.stats.n_out
 
     @property
     def abs_fees(self) -> Iterator[float]:
-        return map(attrgetter('abs_fee'), self.txs)
+        return iter(self.stats.abs_fees)
 
     @property
     def rel_fees(self) -> Iterator[float]:
-        return map(attrgetter('rel_fee'), self.txs)
+        return iter(self.stats.rel_fees)
 
     @cached_property
     def total_fee(self) -> float:
-        return sum(self.abs_fees)
+        return sum(self.stats.abs_fees)
 
     @cached_property
     def median_fee(self) -> Union[int, float]:
-        return median(self.abs_fees)
+        return median(self.stats.abs_fees)
 
     @cached_property
-    def mean_fee(self) -> Union[int, float]:
-        return mean(self.abs_fees)
+    def mean_fee(self) -> float:
+        return fmean(self.stats.abs_fees)
 
     @cached_property
     def median_rel_fee(self) -> float:
-        return median(self.rel_fees)
+        return median(self.stats.rel_fees)
 
     @cached_property
     def mean_rel_fee(self) -> float:
-        return mean(self.rel_fees)
+        return fmean(self.stats.rel_fees)
 
     @cached_property
     def total_in(self) -> float:
         """
         Total value of inputs, in bitcoin
         """
-        return sum(map(attrgetter('total_in'), self.txs))
+        return self.stats.total_in
 
     @cached_property
     def total_out(self) -> float:
         """
         Total value of outputs, in bitcoin
         """
-        return sum(map(attrgetter('total_out'), self.txs))
+        return self.stats.total_out
 
 
 class MempoolTx(Candidate):
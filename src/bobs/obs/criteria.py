@@ -3,12 +3,17 @@ Modules for filters and criteria
 """
 from abc import ABC, abstractmethod
 from enum import Enum
+from functools import lru_cache
 from re import compile as re_compile
-from typing import Callable, Optional, Mapping, AnyStr, Dict, Type, Tuple, cast, Pattern
+from sys import intern
+from typing import Callable, Optional, Mapping, AnyStr, Dict, Type, Tuple, Pattern, FrozenSet
 
 from bobs.types import Any_
 from marshmallow import fields, ValidationError
 
+# Sentinel for a value never seen
+_UNSET = object()
+
 
 class Criterion(ABC):
     """
@@ -17,15 +22,39 @@ class Criterion(ABC):
     Can also be thought of as a condition.
     """
 
-    __slots__ = ()
+    # The key is computed lazily and cached, subclasses __slots__ hold the values
+    __slots__ = ('_key',)
+    _key: Tuple[Any_, ...]
 
     def __eq__(self, other: Any_) -> bool:
         """
-        Most useful for testing purposes.
+        Two criteria are equal if they have the same type and values.
         """
-        if not isinstance(other, self.__class__) or self.__slots__ != other.__slots__:
+        if not isinstance(other, Criterion):
             return False
-        return all(getattr(self, attr) == getattr(other, attr) for attr in cast(Tuple[str], self.__slots__))
+        return self.key == other.key
+
+    def __hash__(self) -> int:
+        """
+        Raise TypeError if any value is unhashable, as tuples do.
+        """
+        return hash(self.key)
+
+    @property
+    def key(self) -> Tuple[Any_, ...]:
+        """
+        Return the type and values of this Criterion, used for equality and hashing.
+        Criteria are immutable, so it's computed only once.
+        """
+        try:
+            return self._key
+        except AttributeError:
+            pass
+        key = self._key = self._compute_key()
+        return key
+
+    def _compute_key(self) -> Tuple[Any_, ...]:
+        return (type(self), *(getattr(self, attr) for attr in self.__slots__))
 
     @abstractmethod
     def __call__(self, candidate: Any_) -> bool:
@@ -144,7 +173,8 @@ class Equal(Criterion):
     __slots__ = ('_value',)
 
     def __init__(self, value: Any_) -> None:
-        self._value = value
+        # Interned strings compare by identity against interned candidate values (e.g. script types)
+        self._value = intern(value) if type(value) is str else value  # pylint: disable=unidiomatic-typecheck
 
     def __call__(self, candidate: Any_) -> bool:
         return candidate == self._value
@@ -166,7 +196,7 @@ class Different(Criterion):
     __slots__ = ('_value',)
 
     def __init__(self, value: Any_) -> None:
-        self._value = value
+        self._value = intern(value) if type(value) is str else value  # pylint: disable=unidiomatic-typecheck
 
     def __call__(self, candidate: Any_) -> bool:
         return candidate != self._value
@@ -205,14 +235,36 @@ class Appear(Criterion):
     True
     >>> appear("hello")
     False
+    >>> appear = Appear(["Hello", "world"])
+    >>> appear("world")
+    True
     """
 
-    __slots__ = ('_value',)
+    __slots__ = ('_value', '_members')
 
     def __init__(self, value: Any_) -> None:
         self._value = value
+        # Collections are also stored as a set, for constant time lookups.
+        # Strings keep their substring semantics.
+        self._members: Optional[FrozenSet[Any_]] = None
+        if isinstance(value, (list, tuple, set, frozenset)):
+            try:
+                self._members = frozenset(value)
+            except TypeError:
+                # Unhashable items
+                pass
+
+    def _compute_key(self) -> Tuple[Any_, ...]:
+        # The set is derived from the value
+        return type(self), self._value
 
     def __call__(self, candidate: Any_) -> bool:
+        if self._members is not None:
+            try:
+                return candidate in self._members
+            except TypeError:
+                # Unhashable candidate, fall back to a linear search
+                pass
         return candidate in self._value
 
 
@@ -249,17 +301,58 @@ class Regex(Criterion):
     False
     """
 
-    __slots__ = ('_value',)
+    __slots__ = ('_value', '_search')
 
     def __init__(self, value: AnyStr) -> None:
         self._value: Pattern[AnyStr] = re_compile(value)  # type: ignore[arg-type] # it complaints about the string type
         # TODO: fix
+        # Bind the search method once, it's called for every candidate.
+        self._search = self._value.search
+
+    def _compute_key(self) -> Tuple[Any_, ...]:
+        # The bound search method compares by identity of the compiled pattern, which depends on the `re` cache
+        return type(self), self._value
 
     def __call__(self, candidate: AnyStr) -> bool:
-        return self._value.search(candidate) is not None  # type: ignore[arg-type] # it complaints about the string type
+        return self._search(candidate) is not None  # type: ignore[arg-type] # it complaints about the string type
         # TODO: fix
 
 
+class Memoized(Criterion):
+    """
+    Wrap a Criterion and remember the result for the last value, compared by identity.
+    Useful when the same Criterion is shared by multiple filters matched against the same candidate.
+    Criteria are assumed to be pure functions of the value.
+
+    >>> memoized = Memoized(Greater(5))
+    >>> value = 7
+    >>> memoized(value)
+    True
+    >>> memoized(value)
+    True
+    >>> memoized(4)
+    False
+    """
+
+    __slots__ = ('_criterion', '_value', '_result')
+
+    def __init__(self, criterion: Criterion) -> None:
+        self._criterion = criterion
+        # Holding a reference to the last value also means its identity can't be reused
+        self._value: Any_ = _UNSET
+        self._result = False
+
+    def _compute_key(self) -> Tuple[Any_, ...]:
+        # The last value and result are just a cache
+        return type(self), self._criterion
+
+    def __call__(self, candidate: Any_) -> bool:
+        if candidate is not self._value:
+            self._result = self._criterion(candidate)
+            self._value = candidate
+        return self._result
+
+
 class CriterionType(Enum):
     GREATER = Greater
     LESSER = Lesser
@@ -272,24 +365,29 @@ class CriterionType(Enum):
     REGEX = Regex
 
 
+# Names allowed in a Criterion string representation, see CriterionField
+_WHITELISTED_NAMES: Dict[str, Type[Criterion]] = {member.value.__name__: member.value for member in CriterionType}
+
+
 class CriterionField(fields.Field):
     """
     Field that deserializes to a Criterion.
     """
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def _restricted_eval(string: str) -> Criterion:
         """
         Only CriterionTypes are accepted.
+        Criteria are immutable, so the same string always returns the same shared instance.
         """
-        whitelisted_names: Dict[str, Type[Criterion]] = {member.value.__name__: member.value for member in
-                                                         CriterionType}
         code = compile(string, "<string>", "eval")
         for name in code.co_names:
-            if name in whitelisted_names:
+            if name in _WHITELISTED_NAMES:
                 continue
             raise ValidationError(f"Use of `{name}` not allowed")
-        return eval(code, {"__builtins__": {}}, whitelisted_names)  # pylint: disable=eval-used
+        # eval() may add to the locals mapping, give it a copy
+        return eval(code, {"__builtins__": {}}, dict(_WHITELISTED_NAMES))  # pylint: disable=eval-used
 
     def _deserialize(
             self,
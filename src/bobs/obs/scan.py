@@ -2,16 +2,85 @@
 Module to scan Bitcoin data.
 """
 from asyncio import run
-from typing import Iterator
+from collections import Counter
+from itertools import chain
+from operator import methodcaller
+from typing import Iterator, Callable, Sequence, List, Dict, Counter as Counter_t
 
 from bobs.network.rest import Rest
 from bobs.obs.candidates import Candidate
+from bobs.obs.criteria import Criterion, Memoized
 from bobs.obs.targets import BlockTxsV3, MempoolTxsV3, Blocks, BlocksV3, MempoolTxs, MempoolTxsV2
 from bobs.obs.utils import parse_start_and_end
-from bobs.types import Toml, Filter, Json, BlockTarget, MemTarget
+from bobs.types import Toml, Filter, Json, BlockTarget, MemTarget, CompiledFilter
 from tqdm import tqdm  # type: ignore[import] # No type-hinting
 
 
+def combine_filters(compiled: Sequence[CompiledFilter], match_all: bool) -> Callable[[Candidate], bool]:
+    """
+    Combine compiled filters into a single predicate, built once per scan instead of once per candidate.
+    If no filters are given, every candidate matches.
+
+    >>> from bobs.obs.criteria import Greater, Lesser
+    >>> compiled = [Candidate.compile_filter({'n_in': Greater(2)}), Candidate.compile_filter({'n_out': Lesser(2)})]
+    >>> candidate = Candidate({'n_in': 3, 'n_out': 3})
+    >>> combine_filters(compiled, match_all=True)(candidate)
+    False
+    >>> combine_filters(compiled, match_all=False)(candidate)
+    True
+    >>> combine_filters([], match_all=False)(candidate)
+    True
+    """
+    if match_all or len(compiled) < 2:
+        # Matching all the filters is matching all their criteria, flatten them into one.
+        flat: CompiledFilter = tuple(chain.from_iterable(compiled))
+        # Called from C, no extra Python frame per candidate
+        return methodcaller('match', flat)
+
+    compiled = share_criteria(compiled)
+
+    def match_any(candidate: Candidate) -> bool:
+        for filter_ in compiled:
+            if candidate.match(filter_):
+                return True
+        return False
+
+    return match_any
+
+
+def share_criteria(compiled: Sequence[CompiledFilter]) -> List[CompiledFilter]:
+    """
+    Replace equal criteria appearing in more than one filter with a single Memoized criterion,
+    so that when filters are tried one after the other on a candidate, each is evaluated once.
+
+    >>> from bobs.obs.criteria import Greater
+    >>> compiled = [Candidate.compile_filter({'n_in': Greater(2)}), Candidate.compile_filter({'n_in': Greater(2)})]
+    >>> shared = share_criteria(compiled)
+    >>> shared[0][0][1] is shared[1][0][1]
+    True
+    """
+    counts: Counter_t[Criterion] = Counter()
+    for filter_ in compiled:
+        for _, criterion in filter_:
+            try:
+                counts[criterion] += 1
+            except TypeError:
+                # Unhashable value, e.g. Include([...]), never shared
+                continue
+    memoized: Dict[Criterion, Criterion] = {criterion: Memoized(criterion)
+                                            for criterion, count in counts.items() if count > 1}
+    if not memoized:
+        return list(compiled)
+
+    def share(criterion: Criterion) -> Criterion:
+        try:
+            return memoized.get(criterion, criterion)
+        except TypeError:
+            return criterion
+
+    return [tuple((get_value, share(criterion)) for get_value, criterion in filter_) for filter_ in compiled]
+
+
 def scan_blocks(start: int,
                 end: int,
                 settings: Toml,
@@ -34,16 +103,14 @@ def scan_blocks(start: int,
     else:
         raise ValueError(f'Invalid candidate {candidate_id}')
     with target(endpoint=endpoint, start=start, end=end) as target_:
-        policy = all if settings['filtering']['match_all'] else any
-        if not filters:
-            # If no filters are selected, every candidate is yielded
-            policy = all
+        matches = combine_filters([target_.compile_filter(filter_) for filter_ in filters],
+                                  settings['filtering']['match_all'])
         candidate: Candidate
         for candidate in tqdm(target_.candidates,
                               miniters=1,
                               mininterval=0.5,
                               total=end + 1 - start):
-            if policy(map(candidate, filters)):
+            if matches(candidate):
                 yield candidate
 
 
@@ -60,10 +127,9 @@ def scan_mem(settings: Toml,
     else:
         raise ValueError(f'Invalid candidate {candidate_id}')
     with target(endpoint=settings['network']['endpoint']) as target_:
-        policy = all if settings['filtering']['match_all'] else any
-        if not filters:
-            policy = all
+        matches = combine_filters([target_.compile_filter(filter_) for filter_ in filters],
+                                  settings['filtering']['match_all'])
         candidate: Candidate
         for candidate in tqdm(target_.candidates):
-            if policy(map(candidate, filters)):
+            if matches(candidate):
                 yield candidate
@@ -4,14 +4,17 @@ Currently mostly Bitcoin Core REST and ZMQ APIs.
 """
 
 from abc import ABC, abstractmethod
-from asyncio import Semaphore, create_task, gather, run, Lock
+from asyncio import Semaphore, Task, Queue as AsyncQueue, create_task, gather, run, set_event_loop_policy
+from importlib import import_module
 from multiprocessing import Process, Queue
+from queue import Queue as ThreadQueue
 from sys import byteorder
-from typing import Optional, Iterator, ClassVar, Type, List
+from threading import Thread
+from typing import Optional, Iterator, AsyncIterator, ClassVar, Type, List, Callable, Awaitable, Iterable, Tuple, Dict, Union
 
-from bobs.network.rest import Rest, RestApi
+from bobs.network.rest import Rest, RestApi, MAX_GETUTXOS_OUTPOINTS
 from bobs.obs.candidates import Candidate, BlockV3, Block, MempoolTx, MempoolTxV2, MempoolTxV3, TransactionV3
-from bobs.types import Json, RawData, Bytes, Any_
+from bobs.types import Json, RawData, Bytes, Any_, Filter, CompiledFilter
 from orjson import loads, dumps
 from psutil import pid_exists  # type: ignore[import] # no type-hinting
 
@@ -34,16 +37,25 @@ class Target(ABC):
     _TIMEOUT: ClassVar[int] = 3
     # The Candidate object for the result, subclasses should override it
     _CANDIDATE: ClassVar[Type[Candidate]] = Candidate
+    # Minimum size of the chunks streamed through the result Queue (but the last one of a buffer),
+    # each one is pickled and sent separately, see _put_buffer().
+    _CHUNK_SIZE: ClassVar[int] = 1 << 20
+    # If False, the Gatherer is a thread of this process instead
+    _USE_PROCESS: ClassVar[bool] = True
 
-    __slots__ = ('endpoint', '_gatherer', '_result_queue')
+    __slots__ = ('endpoint', '_gatherer', '_result_queue', '_error')
 
     def __init__(self, endpoint: str) -> None:
         self.endpoint = endpoint
+        # Error of a Gatherer thread, re-raised by the consumer
+        self._error: Optional[Exception] = None
         # TODO: There is a deadlock between the 2 processes when using Pipe() instead of Queue(),
         # find a way to solve it because Pipe() would be the best solution.
-        self._result_queue: Queue[bytes] = Queue()
-        self._gatherer: Process = Process(target=self._gatherer_process,
-                                          name='gatherer')
+        # A Gatherer thread has nothing to pickle through a pipe, a thread Queue is enough.
+        self._result_queue: Union['Queue[bytes]', 'ThreadQueue[bytes]'] = Queue() if self._USE_PROCESS else ThreadQueue()
+        self._gatherer: Union[Process, Thread] = (Process(target=self._gatherer_process, name='gatherer')
+                                                  if self._USE_PROCESS else
+                                                  Thread(target=self._gatherer_thread, name='gatherer', daemon=True))
         self._start()
 
     def __enter__(self) -> 'Target':
@@ -54,20 +66,23 @@ class Target(ABC):
 
     def _start(self) -> None:
         """
-        Start the Gatherer process.
+        Start the Gatherer.
         """
         if self._gatherer.is_alive():
             raise RuntimeError('Cannot start an already running Gatherer')
         self._gatherer.start()
-        if not (self._gatherer.is_alive() and pid_exists(self._gatherer.pid)):
+        if isinstance(self._gatherer, Process) and not (self._gatherer.is_alive() and pid_exists(self._gatherer.pid)):
             raise RuntimeError("Gatherer process couldn't start")
 
     def _stop(self) -> None:
         """
         Stop gatherer process and close result Queue.
+        A Gatherer thread cannot be stopped, it's a daemon thread left to end with its worker.
         """
-        pid = self._gatherer.pid
+        if isinstance(self._gatherer, Thread) or isinstance(self._result_queue, ThreadQueue):
+            return
         self._result_queue.close()
+        pid = self._gatherer.pid
         self._gatherer.terminate()
         self._gatherer.join(self._TIMEOUT)
         if self._gatherer.is_alive():
@@ -81,33 +96,92 @@ class Target(ABC):
         """
         This is the target of multiprocessing.Process().
         Run the worker in a separate process and put results in the result Queue.
+        Use the uvloop event loop if available, see the `speedups` extra.
         """
+        try:
+            uvloop = import_module('uvloop')
+        except ImportError:
+            pass
+        else:
+            # Only affects the gatherer process
+            set_event_loop_policy(uvloop.EventLoopPolicy())
         run(self._worker())
 
+    def _gatherer_thread(self) -> None:
+        """
+        This is the target of threading.Thread().
+        Run the worker with its own event loop, so it works even if the caller is already running one.
+        """
+        try:
+            run(self._worker())
+        except Exception as err:  # pylint: disable=broad-except
+            # Hand it over to the consumer, rather than leaving it waiting forever, see _get_buffers()
+            self._error = err
+            self._result_queue.put_nowait(b'END')
+
     @abstractmethod
     async def _worker(self) -> None:
         """
         The main gatherer worker.
         """
 
+    async def _put_buffer(self, chunks: AsyncIterator[bytes]) -> None:
+        """
+        Put a whole buffer in the result Queue, followed by b''.
+        Socket reads return much less than _CHUNK_SIZE, they are joined so fewer bigger chunks are sent.
+        """
+        pending: List[bytes] = []
+        size = 0
+        async for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= self._CHUNK_SIZE:
+                self._result_queue.put_nowait(b''.join(pending))
+                pending = []
+                size = 0
+        if pending:
+            self._result_queue.put_nowait(b''.join(pending))
+        self._result_queue.put_nowait(b'')
+
+    @staticmethod
+    async def _map_pool(func: Callable[[str, RawData], Awaitable[None]],
+                        items: Iterable[Tuple[str, RawData]],
+                        size: int) -> None:
+        """
+        Await `func(*item)` for each item, with a pool of `size` workers pulling from the same iterator.
+        Unlike creating a task per item, memory doesn't grow with the number of items.
+        """
+
+        async def worker() -> None:
+            for item in iterator:
+                await func(*item)
+
+        iterator = iter(items)
+        await gather(*(worker() for _ in range(size)))
+
     def _get_buffers(self, block: bool = True, timeout: Optional[float] = None) -> Iterator[Bytes]:
         """
-        Compute and return a bytearray with the next complete buffer of bytes from the result Queue.
+        Compute and return the next complete buffer of bytes from the result Queue.
         This is the concatenation of all chunks until a b'' chunk is found.
         Subclasses should reimplement if needed to add custom logic.
 
         If `block` is True, this blocks until something is put in the result Queue.
+        If a Gatherer thread failed, its error is raised once its chunks are consumed.
         """
-        buffer = bytearray()
+        # Join all the chunks at once, rather than growing a bytearray chunk after chunk
+        chunks: List[bytes] = []
+        get = self._result_queue.get
         while True:
-            chunk = self._result_queue.get(block=block, timeout=timeout)
+            chunk = get(block=block, timeout=timeout)
             if chunk == b'':
-                yield buffer
-                buffer = bytearray()
+                yield b''.join(chunks)
+                chunks = []
                 continue
             if chunk == b'END':
+                if self._error is not None:
+                    raise self._error
                 break
-            buffer += chunk
+            chunks.append(chunk)
 
     def _get_raw_candidates(self) -> Iterator[Json]:
         """
@@ -124,6 +198,13 @@ class Target(ABC):
         """
         return map(self._CANDIDATE, self._get_raw_candidates())
 
+    @classmethod
+    def compile_filter(cls, filter_: Filter) -> CompiledFilter:
+        """
+        Compile `filter_` for the Candidate type of this Target, see Candidate.compile_filter().
+        """
+        return cls._CANDIDATE.compile_filter(filter_)
+
     @property
     def next(self) -> Optional[Candidate]:
         """
@@ -140,6 +221,12 @@ class Blocks(Target):
 
     _API: ClassVar[RestApi] = RestApi.BLOCK_NO_DETAILS
     _CANDIDATE: ClassVar[Type[Block]] = Block
+    # Maximum number of concurrent block requests
+    _CONCURRENCY: ClassVar[int] = 3
+    # Number of block hashes requested together, ahead of the blocks
+    _HASH_BATCH: ClassVar[int] = 100
+    # Maximum number of concurrent block hash requests
+    _HASH_CONCURRENCY: ClassVar[int] = 8
 
     def __init__(self, endpoint: str, start: int, end: int) -> None:
         self._start_height = start
@@ -147,23 +234,54 @@ class Blocks(Target):
         super().__init__(endpoint)
 
     async def _worker(self) -> None:
-        async def task(height: int) -> None:
-            async with sem:
-                stream = await rest.get_chunks(self._API, await rest.get_blockhash(height))
-                # Process one response at a time.
-                # Bitcoin Core is synchronous anyway, but we still get a benefit from
-                # doing all the dance till here concurrently.
-                # The lock also helps not to mess up the Queue stream.
-                async with lock:
-                    async for chunk in stream:
-                        self._result_queue.put_nowait(chunk)
-                    self._result_queue.put_nowait(b'')
-
-        sem = Semaphore(3)
-        lock = Lock()
+        async def fetch(blockhash: str) -> AsyncIterator[bytes]:
+            try:
+                return await rest.get_chunks(self._API, blockhash)
+            finally:
+                sem.release()
+
+        async def get_blockhash(height: int) -> str:
+            async with hash_sem:
+                return await rest.get_blockhash(height)
+
+        async def get_hashes(heights: range) -> List[str]:
+            return await gather(*map(get_blockhash, heights))
+
+        async def produce() -> None:
+            # Bounded producer, at most `_CONCURRENCY` requests are in flight and
+            # at most `2 * _CONCURRENCY` responses wait to be consumed.
+            # Block hashes are resolved in batches, one batch ahead of the block requests.
+            batches = [range(height, min(height + self._HASH_BATCH, self._end_height + 1))
+                       for height in range(self._start_height, self._end_height + 1, self._HASH_BATCH)]
+            try:
+                if batches:
+                    next_hashes = create_task(get_hashes(batches[0]))
+                    try:
+                        for i in range(len(batches)):
+                            hashes = await next_hashes
+                            if i + 1 < len(batches):
+                                next_hashes = create_task(get_hashes(batches[i + 1]))
+                            for blockhash in hashes:
+                                await sem.acquire()
+                                await pending.put(create_task(fetch(blockhash)))
+                    finally:
+                        next_hashes.cancel()
+            finally:
+                # Always wake up the consumer, even on error, it then re-raises it by awaiting the producer
+                await pending.put(None)
+
+        sem = Semaphore(self._CONCURRENCY)
+        hash_sem = Semaphore(self._HASH_CONCURRENCY)
+        pending: 'AsyncQueue[Optional[Task[AsyncIterator[bytes]]]]' = AsyncQueue(maxsize=2 * self._CONCURRENCY)
         async with Rest(endpoint=self.endpoint) as rest:
-            tasks = (create_task(task(height)) for height in range(self._start_height, self._end_height + 1))
-            await gather(*tasks)
+            producer = create_task(produce())
+            try:
+                # Single consumer, blocks are streamed to the Queue one at a time and in height order.
+                while (fetched := await pending.get()) is not None:
+                    await self._put_buffer(await fetched)
+                await producer
+            finally:
+                producer.cancel()
             self._result_queue.put_nowait(b'END')
 
 
@@ -188,36 +306,41 @@ class BlockTxsV3(BlocksV3):
     def _get_raw_candidates(self) -> Iterator[Json]:
         for buffer in self._get_buffers():
             block: Json = loads(buffer)
+            time, height = block['time'], block['height']
             tx: Json
             for tx in block['tx']:
-                tx['timestamp_date'] = block['time']
-                tx['height'] = block['height']
+                tx['timestamp_date'] = time
+                tx['height'] = height
                 yield tx
 
 
 class MempoolTxs(Target):
     """
     Base target to iterate fee related transaction info only.
+    The whole mempool is a single response, so it's fetched by a Gatherer thread rather than a process.
     """
 
     __slots__ = ()
 
     _CANDIDATE: ClassVar[Type[MempoolTx]] = MempoolTx
+    _USE_PROCESS: ClassVar[bool] = False
 
     async def _worker(self) -> None:
         async with Rest(endpoint=self.endpoint) as rest:
-            async for chunk in await rest.get_chunks(RestApi.MEMPOOL_CONTENT):
-                self._result_queue.put_nowait(chunk)
-            self._result_queue.put_nowait(b'')
+            await self._put_buffer(await rest.get_chunks(RestApi.MEMPOOL_CONTENT))
             self._result_queue.put_nowait(b'END')
 
     def _get_raw_candidates(self) -> Iterator[Json]:
         try:
-            for txid, tx in loads(next(self._get_buffers())).items():
-                tx['txid'] = txid
-                yield tx
+            mempool: Json = loads(next(self._get_buffers()))
         except StopIteration:
             return
+        # Pop each transaction, so the ones not matching can be freed while iterating,
+        # rather than the whole mempool being kept alive until the end.
+        for txid in list(mempool):
+            tx: Json = mempool.pop(txid)
+            tx['txid'] = txid
+            yield tx
 
 
 class MempoolTxsV2(Target):
@@ -228,18 +351,18 @@ class MempoolTxsV2(Target):
     __slots__ = ()
 
     _CANDIDATE: ClassVar[Type[MempoolTxV2]] = MempoolTxV2
+    # Number of transactions processed concurrently
+    _CONCURRENCY: ClassVar[int] = 3
 
     async def _worker(self) -> None:
         async def task(txid: str, data: RawData) -> None:
-            async with sem:
-                self._result_queue.put_nowait(await rest.get_bytes(RestApi.TX, txid))
-                self._result_queue.put_nowait(data['height'].to_bytes(3, byteorder=byteorder))
-                self._result_queue.put_nowait(data['time'].to_bytes(8, byteorder=byteorder))
+            # A single frame per transaction: height, time, then the transaction itself
+            self._result_queue.put_nowait(data['height'].to_bytes(3, byteorder=byteorder) +
+                                          data['time'].to_bytes(8, byteorder=byteorder) +
+                                          await rest.get_bytes(RestApi.TX, txid))
 
-        sem = Semaphore(3)
         async with Rest(endpoint=self.endpoint) as rest:
-            tasks = (create_task(task(txid, data)) for txid, data in (await rest.get_mempool(True)).items())
-            await gather(*tasks)
+            await self._map_pool(task, (await rest.get_mempool(True)).items(), self._CONCURRENCY)
             self._result_queue.put_nowait(b'END')
 
     def _get_buffers(self, block: bool = True, timeout: Optional[float] = None) -> Iterator[bytes]:
@@ -250,16 +373,12 @@ class MempoolTxsV2(Target):
             yield buffer
 
     def _get_raw_candidates(self) -> Iterator[Json]:
-        buffers = self._get_buffers()
-        for buffer in buffers:
-            tx: Json = loads(buffer)
-            try:
-                height = int.from_bytes(next(buffers), byteorder=byteorder)
-                time = int.from_bytes(next(buffers), byteorder=byteorder)
-            except StopIteration:
-                return
-            tx['timestamp_date'] = time
-            tx['height'] = height
+        for buffer in self._get_buffers():
+            frame = memoryview(buffer)
+            # orjson does accept memoryview, the stubs are outdated
+            tx: Json = loads(frame[11:])  # type: ignore[arg-type]
+            tx['height'] = int.from_bytes(frame[:3], byteorder=byteorder)
+            tx['timestamp_date'] = int.from_bytes(frame[3:11], byteorder=byteorder)
             yield tx
 
 
@@ -267,37 +386,64 @@ class MempoolTxsV3(MempoolTxsV2):
     __slots__ = ()
 
     _CANDIDATE: ClassVar[Type[MempoolTxV3]] = MempoolTxV3
+    # Maximum number of concurrent getutxos requests, across all transactions
+    _INPUT_CONCURRENCY: ClassVar[int] = 16
+    # Maximum number of mempool parent transactions kept, they are often spent by several transactions
+    _PARENTS_CACHE_SIZE: ClassVar[int] = 4096
 
     async def _worker(self) -> None:
 
-        async def update_inputs(tx_input: Json) -> None:
-            utxos: List[Json] = (await rest.get_utxos(f"{tx_input['txid']}-{tx_input['vout']}"))[
-                'utxos']
-            if not utxos:
-                # It's spending from another mempool transaction
-                utxo: Json = (await rest.get_tx(tx_input['txid']))['vout'][tx_input['vout']]
-                # No height
-                utxo['height'] = 0
-            else:
-                utxo = utxos[0]
-            tx_input['prevout'] = utxo
+        async def get_parent(txid: str) -> Json:
+            """
+            Get a mempool parent transaction, sharing the request with the other inputs spending from it.
+            """
+            try:
+                parent = parents[txid]
+            except KeyError:
+                parent = parents[txid] = create_task(rest.get_tx(txid))
+                if len(parents) > self._PARENTS_CACHE_SIZE:
+                    # Evict the oldest
+                    del parents[next(iter(parents))]
+            return await parent
+
+        async def update_inputs(tx_inputs: List[Json]) -> None:
+            """
+            Get the prevouts of up to MAX_GETUTXOS_OUTPOINTS inputs with a single getutxos request.
+            """
+            # Bound the requests for all inputs, a single transaction can have thousands of them
+            async with input_sem:
+                result: Json = await rest.get_utxos(*(f"{tx_input['txid']}-{tx_input['vout']}"
+                                                      for tx_input in tx_inputs))
+                # The bitmap tells which outpoints are unspent, only those are in `utxos`
+                utxos = iter(result['utxos'])
+                for tx_input, unspent in zip(tx_inputs, result['bitmap']):
+                    if unspent == '1':
+                        tx_input['prevout'] = next(utxos)
+                        continue
+                    # It's spending from another mempool transaction.
+                    # Copy the output, the parent is shared.
+                    utxo: Json = dict((await get_parent(tx_input['txid']))['vout'][tx_input['vout']])
+                    # No height
+                    utxo['height'] = 0
+                    tx_input['prevout'] = utxo
 
         async def task(txid: str, data: RawData) -> None:
             """
             Given a TXID, gets the incomplete mempool transaction, asynchronously calls get_utxos/get_tx to
             get prevout information for each transaction input.
             """
-            async with sem:
-                tx: Json = await rest.get_tx(txid)
-                tx['height'] = data['height']
-                tx['timestamp_date'] = data['time']
-                await gather(*map(update_inputs, tx['vin']))
+            tx: Json = await rest.get_tx(txid)
+            tx['height'] = data['height']
+            tx['timestamp_date'] = data['time']
+            tx_inputs: List[Json] = tx['vin']
+            await gather(*(update_inputs(tx_inputs[i:i + MAX_GETUTXOS_OUTPOINTS])
+                           for i in range(0, len(tx_inputs), MAX_GETUTXOS_OUTPOINTS)))
             self._result_queue.put_nowait(dumps(tx))
 
-        sem = Semaphore(3)
+        input_sem = Semaphore(self._INPUT_CONCURRENCY)
+        parents: Dict[str, 'Task[Json]'] = {}
         async with Rest(endpoint=self.endpoint) as rest:
-            tasks = (create_task(task(txid, data)) for txid, data in (await rest.get_mempool(True)).items())
-            await gather(*tasks)
+            await self._map_pool(task, (await rest.get_mempool(True)).items(), self._CONCURRENCY)
             self._result_queue.put_nowait(b'END')
 
     def _get_raw_candidates(self) -> Iterator[Json]:
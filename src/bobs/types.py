@@ -2,10 +2,11 @@
 Collection of custom types and aliases.
 """
 
-from typing import Dict, Union, Any, Mapping, TYPE_CHECKING, Type
+from typing import Dict, Union, Any, Mapping, TYPE_CHECKING, Type, Callable, Tuple
 
 if TYPE_CHECKING:
     # Avoid circular import
+    from bobs.obs.candidates import Candidate
     from bobs.obs.criteria import Criterion
     from bobs.obs.targets import Blocks, BlockTxsV3, BlocksV3, MempoolTxs, MempoolTxsV2, MempoolTxsV3
 # For Python 3.8 compatibility, see https://mypy.readthedocs.io/en/latest/kinds_of_types.html#type-aliases
@@ -45,3 +46,9 @@ Json: TypeAlias = Dict[str, Any_]
 
 # Raw data for Candidate objects
 RawData: TypeAlias = Mapping[str, Any_]
+
+# Get the value to match against a Criterion from a Candidate
+ValueGetter: TypeAlias = Callable[['Candidate'], Any_]
+
+# A Filter compiled for a Candidate type, see Candidate.compile_filter()
+CompiledFilter: TypeAlias = Tuple[Tuple[ValueGetter, 'Criterion'], ...]
@@ -10,6 +10,7 @@ REQUIRED_DEPS = [
 ]
 EXTRA_DEPS = {
     'jupyter': ['jupyterlab', 'ipython', 'pandas', 'numpy', 'matplotlib', 'pyarrow'],
+    'speedups': ['uvloop; platform_system != "Windows"'],
     'dev': ['hypothesis', 'pytest', 'pytest-asyncio', 'mypy', 'pylint']
 }
 
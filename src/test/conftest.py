@@ -57,9 +57,8 @@ async def init_rest(settings: Toml) -> Rest:
 def tx_rest_json() -> Json:
     # If desired these two values have to be added manually,
     # Bitcoin Core does not include them.
-    TRANSACTION_REST_JSON['timestamp_date'] = 100000
-    TRANSACTION_REST_JSON['height'] = 1000
-    return TRANSACTION_REST_JSON
+    # Shallow copy, the module level data is shared across tests.
+    return {**TRANSACTION_REST_JSON, 'timestamp_date': 100000, 'height': 1000}
 
 
 @fixture()
@@ -84,10 +83,7 @@ def tx_candidate(tx_rest_json: Json) -> Transaction:
 
 @fixture()
 def txv3(blockv3_rest_json: Json) -> TransactionV3:
-    tx = blockv3_rest_json['tx'][1]
-    tx['timestamp_date'] = 100000
-    tx['height'] = 1000
-    return TransactionV3(tx)
+    return TransactionV3({**blockv3_rest_json['tx'][1], 'timestamp_date': 100000, 'height': 1000})
 
 
 @fixture()
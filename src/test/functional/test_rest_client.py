@@ -3,6 +3,7 @@ Test the Rest client object against a real Bitcoin Core REST interface.
 For now only testing the REST APIs we use, TODO: cover all.
 """
 # Use standard json and not orjson for compatibility testing
+from asyncio import gather
 from json import loads
 from typing import List
 
@@ -95,9 +96,10 @@ async def test_get_response(init_rest: Rest) -> None:
         assert tx['txid'] == txid
         assert tx['weight'] == mem_tx['weight']
         # Get the inputs from each mempool transaction and try to get them from
-        # UTXO API.
-        for tx_input in tx['vin']:
-            utxos_response = await init_rest.get_response(RestApi.UTXO, f"{tx_input['txid']}-{tx_input['vout']}")
+        # UTXO API, requested concurrently over the connection pool.
+        utxos_responses = await gather(*(init_rest.get_response(RestApi.UTXO, f"{tx_input['txid']}-{tx_input['vout']}")
+                                         for tx_input in tx['vin']))
+        for utxos_response in utxos_responses:
             utxos = await utxos_response.json(encoding='UTF-8')
             assert 'utxos' in utxos
             utxos = utxos['utxos']
@@ -7,8 +7,10 @@ from json import dumps
 from statistics import median, mean
 
 import pytest
-from bobs.obs.candidates import Candidate, TransactionV3
-from bobs.obs.criteria import Criterion
+from bobs.obs.candidates import Candidate, TransactionV3, Transaction, Block, format_timestamp
+from bobs.obs.criteria import Criterion, Equal, Greater, Include, Regex, Satisfy
+from bobs.settings import Settings
+from hypothesis import given, strategies as st
 
 EXAMPLE_RAW_DATA = {'test': 'data'}
 
@@ -54,6 +56,53 @@ def test_match_criterion() -> None:
     assert candidate.match_criterion('not_found', fake_criterion) is False
 
 
+@given(st.integers(min_value=0, max_value=2 ** 37))
+def test_format_timestamp(timestamp: int) -> None:
+    assert format_timestamp(timestamp) == dt.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+
+
+def test_compile_filter(tx_candidate: Transaction, txv3: TransactionV3, block_candidate: Block) -> None:
+    """
+    Check compiled filters match exactly as match_criterion() does, using the default settings filters.
+    """
+    for filter_ in Settings.from_default()['filters'].values():
+        for candidate in (tx_candidate, txv3, block_candidate):
+            compiled = type(candidate).compile_filter(filter_)
+            assert len(compiled) == len(filter_)
+            try:
+                expected = all(candidate.match_criterion(id_, criterion) for id_, criterion in filter_.items())
+            except TypeError:
+                # E.g., a numeric criterion against the entire candidate, it has to fail the same way
+                with pytest.raises(TypeError):
+                    candidate.match(compiled)
+                continue
+            assert candidate.match(compiled) is expected
+            assert candidate(filter_) is expected
+
+
+def test_compile_filter_order(tx_candidate: Transaction) -> None:
+    """
+    Check the order of the filter is kept, earlier criteria guard the later ones.
+    """
+    regex, include, greater, equal = Regex('a'), Include('a'), Greater(1), Equal(1)
+    satisfy = Satisfy(lambda tx: True)
+    filter_ = {'a': regex, 'b': include, 'n_in': greater, 'c': equal, '_': satisfy, 'd': regex, 'e': equal}
+    compiled = Transaction.compile_filter(filter_)
+    assert [criterion for _, criterion in compiled] == [regex, include, greater, equal, satisfy, regex, equal]
+    # There is no fee, Greater would be called with the entire candidate and raise TypeError
+    assert 'fee' not in tx_candidate
+    assert tx_candidate.match(Transaction.compile_filter({'n_in': Greater(100), 'fee': Greater(0.001)})) is False
+
+
+def test_raw_data_field(tx_candidate: Transaction) -> None:
+    assert tx_candidate.txid == tx_candidate.raw_data['txid']
+    # Filters read raw data fields from the raw data directly
+    assert not Transaction.is_attribute('txid')
+    assert Transaction.is_attribute('n_in')
+    with pytest.raises(KeyError):
+        _ = Transaction({}).txid
+
+
 def test_transaction(tx_candidate) -> None:
     # Test inputs
     inputs = tx_candidate.inputs
@@ -234,6 +283,14 @@ def test_blockv3(blockv3_candidate) -> None:
     assert blockv3_candidate.median_rel_fee == median((fee1, fee2, fee3))
     # Test the mean of all relative fees in the block.
     assert blockv3_candidate.mean_rel_fee == mean((fee1, fee2, fee3))
+    # All the aggregated properties come from a single pass over the transactions
+    stats = blockv3_candidate.stats
+    assert stats.n_in == blockv3_candidate.n_in
+    assert stats.n_out == blockv3_candidate.n_out
+    assert stats.abs_fees == (0, 0.001, 0.0004775)
+    assert stats.rel_fees == (fee1, fee2, fee3)
+    assert stats.total_in == blockv3_candidate.total_in
+    assert stats.total_out == blockv3_candidate.total_out
     # Test the sum of all inputs UTXOs
     assert blockv3_candidate.total_in == 0 + 4.58794295 + 0.71996206
     # Test the sum of all inputs UTXOs
@@ -0,0 +1,61 @@
+"""
+Test the command line arguments parsing
+"""
+from shlex import split
+
+from bobs.cli.commands import parse_fast, get_parser
+from pytest import mark
+
+
+@mark.parametrize('command_line', [
+    '',
+    'scan',
+    'monitor',
+    '-f coinbase',
+    '-f coinbase -f txid -d scan -s -100 -e 10',
+    '-ddd -f joinmarket scan -s -100 -e 0',
+    '-d -d --details -t mempool -c txv2',
+    '--filter scan -fmt simple -fa jm -se . scan --start 5 --end 10',
+    '-f -5 scan -s 1 -s 2',
+    '-se /this/path/does/not/exist',
+])
+def test_parse_fast(command_line: str) -> None:
+    """
+    Check the fast parser handles common command lines exactly as argparse.
+    """
+    args = split(command_line)
+    namespace = parse_fast(args)
+    assert namespace is not None
+    assert namespace == get_parser().parse_args(args)
+
+
+@mark.parametrize('command_line', [
+    '-h',
+    'scan --help',
+    '--filt coinbase',
+    '--filter=coinbase',
+    '-fcoinbase',
+    '-f',
+    '-f -x',
+    '-t invalid',
+    '-c invalid',
+    'scan -s one',
+    'scan -f coinbase',
+    'scan monitor',
+    'invalid',
+])
+def test_parse_fast_fallback(command_line: str) -> None:
+    """
+    Check the fast parser gives up on anything it doesn't handle.
+    """
+    assert parse_fast(split(command_line)) is None
+
+
+def test_parse_fallback_subcommand_value() -> None:
+    """
+    Check the argparse parser handles a subcommand name given as an option value.
+    """
+    namespace = get_parser().parse_args(split('--filt monitor scan -s -5'))
+    assert namespace.filter == ['monitor']
+    assert namespace.start == -5
+    assert get_parser().parse_args(split('--filt monitor scan')).start is None
@@ -1,7 +1,7 @@
 """
 Criteria objects unit tests
 """
-from re import compile as re_compile
+from re import compile as re_compile, purge
 from typing import Union, List, Set
 
 import pytest
@@ -83,6 +83,18 @@ def test_different(value: str, candidate: str) -> None:
         assert different(candidate) is False
 
 
+def test_str_subclass() -> None:
+    """
+    Only exact strings are interned, sys.intern() rejects subclasses.
+    """
+
+    class Name(str):
+        pass
+
+    assert Equal(Name('a'))('a') is True
+    assert Different(Name('a'))('a') is False
+
+
 @given(st.data())
 def test_include(data: DrawObject) -> None:
     value: Union[int, str] = data.draw(st.one_of(st.integers(), st.text()))
@@ -107,6 +119,18 @@ def test_appear(value: Union[str, List[str]], candidate: str) -> None:
         assert appear(candidate) is False
 
 
+def test_appear_collections() -> None:
+    # Collections are matched through a set, with the same result as a linear search
+    assert Appear(['a', 'b'])('a') is True
+    assert Appear(('a', 'b'))('c') is False
+    assert Appear([1, 2])(True) is True
+    # Unhashable candidates and items fall back to the linear search
+    assert Appear([[1], [2]])([1]) is True
+    assert Appear(['a'])(['a']) is False
+    assert Appear(['a', 'b']) == Appear(['a', 'b'])
+    assert Appear(['a', 'b']) != Appear(('a', 'b'))
+
+
 @given(st.integers())
 def test_satisfy(candidate: int) -> None:
     def example_callable(num: int) -> bool:
@@ -147,3 +171,19 @@ def test_restricted_eval() -> None:
         CriterionField._restricted_eval(forbidden_string)
     accepted_string = "Greater(5)"
     assert Greater(5) == CriterionField._restricted_eval(accepted_string)
+    assert CriterionField._restricted_eval(accepted_string) is CriterionField._restricted_eval(accepted_string)
+
+
+def test_equality() -> None:
+    assert Greater(5) == Greater(5)
+    assert Greater(5) != Greater(5, inclusive=False)
+    assert Greater(5) != Lesser(5)
+    assert Regex('a') == Regex('a')
+    regex = Regex('ab+c')
+    purge()
+    assert Regex('ab+c') == regex
+    assert hash(Regex('ab+c')) == hash(regex)
+    assert hash(Equal('a')) == hash(Equal('a'))
+    assert {Between(1, 2): True}[Between(1, 2)]
+    with pytest.raises(TypeError):
+        hash(Include([1]))
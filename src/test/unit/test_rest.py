@@ -56,3 +56,4 @@ async def test_get_uri(uninit_rest: Rest) -> None:
     assert uninit_rest.get_uri(RestApi.TX) == 'http://127.0.0.1:8332/rest/tx.json'
     assert uninit_rest.get_uri(RestApi.TX, 'txid') == 'http://127.0.0.1:8332/rest/tx/txid.json'
     assert uninit_rest.get_uri(RestApi.TX, 'txid1', 'txid2') == 'http://127.0.0.1:8332/rest/tx/txid1/txid2.json'
+    assert uninit_rest.get_uri(RestApi.BLOCK, 'hash', req_type=ReqType.BIN) == 'http://127.0.0.1:8332/rest/block/hash.bin'
@@ -22,6 +22,7 @@ def test_settings() -> None:
     assert settings['filters']['txid'] == {'txid': Include('')}
     assert settings['filters']['address'] == {'addresses': Include('')}
     assert settings['filters']['huge_vsize'] == {'vsize': Greater(50000)}
+    assert Settings.from_default() is settings
 
 
 def test_malformed() -> None:
@@ -34,3 +35,11 @@ def test_malformed() -> None:
     """
     with raises(ValidationError):
         Settings().load(loads(malformed_toml))
+
+
+def test_invalid_path() -> None:
+    """
+    Test Settings from file correctly catches invalid directories
+    """
+    with raises(ValueError):
+        Settings.from_file('/this/path/does/not/exist')
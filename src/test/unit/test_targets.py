@@ -2,12 +2,17 @@
 Test basic inner methods of Target abstract class.
 """
 # pylint: disable=protected-access
+from asyncio import sleep, wait_for
+from collections import Counter
 from queue import Empty
+from typing import AsyncIterator, Dict, List, Tuple, Counter as Counter_t
 
 import pytest
+from bobs.network.rest import RestApi, MAX_GETUTXOS_OUTPOINTS
 from bobs.obs.candidates import Candidate
-from bobs.obs.targets import Target
-from orjson import dumps
+from bobs.obs.targets import Target, Blocks, MempoolTxsV3
+from bobs.types import Any_, Json
+from orjson import dumps, loads
 
 
 class FakeTarget(Target):
@@ -121,3 +126,198 @@ def test_next() -> None:
     assert isinstance(candidate, Candidate)
     assert candidate.raw_data == test_dict
     assert target.next is None
+
+
+class FailingThreadTarget(Target):
+    """
+    Target with a Gatherer thread whose worker fails.
+    """
+
+    _USE_PROCESS = False
+
+    async def _worker(self) -> None:
+        self._result_queue.put_nowait(dumps({'foo': 'bar'}))
+        self._result_queue.put_nowait(b'')
+        raise ValueError('No mempool')
+
+
+def test_gatherer_thread_error() -> None:
+    with FailingThreadTarget('') as target:
+        candidates = target.candidates
+        # What came before the error is still yielded, then the error is raised rather than the stream just ending
+        assert next(candidates).raw_data == {'foo': 'bar'}
+        with pytest.raises(ValueError, match='No mempool'):
+            next(candidates)
+
+
+@pytest.mark.asyncio
+async def test_put_buffer(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def chunks() -> AsyncIterator[bytes]:
+        for chunk in (b'foo', b'ba', b'r', b'foobar', b'ba', b'z'):
+            yield chunk
+
+    monkeypatch.setattr(FakeTarget, '_CHUNK_SIZE', 4)
+    target = FakeTarget('')
+    await target._put_buffer(chunks())
+    # Small chunks are joined until they reach _CHUNK_SIZE, the last one can be smaller
+    assert [target._result_queue.get(timeout=1) for _ in range(4)] == [b'fooba', b'rfoobar', b'baz', b'']
+
+
+class FakeRest:
+    """
+    Fake REST client, block hashes are the heights as strings and blocks only contain their height.
+    """
+    # Height at which get_blockhash raises, if any
+    fail_at = -1
+    # Current and maximum number of concurrent get_blockhash calls
+    hash_requests = 0
+    max_hash_requests = 0
+
+    def __init__(self, endpoint: str = '') -> None:
+        self.endpoint = endpoint
+
+    async def __aenter__(self) -> 'FakeRest':
+        return self
+
+    async def __aexit__(self, *args: Any_) -> None:
+        pass
+
+    async def get_blockhash(self, height: int) -> str:
+        FakeRest.hash_requests += 1
+        FakeRest.max_hash_requests = max(FakeRest.max_hash_requests, FakeRest.hash_requests)
+        try:
+            await sleep(0)
+            if height == self.fail_at:
+                raise ValueError(f'No block at {height}')
+            return str(height)
+        finally:
+            FakeRest.hash_requests -= 1
+
+    async def get_chunks(self, method: RestApi, blockhash: str) -> AsyncIterator[bytes]:
+        async def chunks() -> AsyncIterator[bytes]:
+            yield dumps({'height': int(blockhash)})
+
+        return chunks()
+
+
+class FakeBlocks(Blocks):
+    """
+    Blocks target which runs the worker in process.
+    """
+
+    def _start(self) -> None:
+        """
+        Do not start a process.
+        """
+
+
+@pytest.mark.asyncio
+async def test_blocks_worker(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('bobs.obs.targets.Rest', FakeRest)
+    monkeypatch.setattr(FakeRest, 'max_hash_requests', 0)
+    # Span multiple hash batches
+    target = FakeBlocks('', 0, 2 * FakeBlocks._HASH_BATCH + 10)
+    await wait_for(target._worker(), 5)
+    heights: List[int] = [block['height'] for block in target.candidates]
+    assert heights == list(range(2 * FakeBlocks._HASH_BATCH + 11))
+    assert 1 < FakeRest.max_hash_requests <= FakeBlocks._HASH_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_blocks_worker_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('bobs.obs.targets.Rest', FakeRest)
+    monkeypatch.setattr(FakeRest, 'fail_at', FakeBlocks._HASH_BATCH + 5)
+    target = FakeBlocks('', 0, 2 * FakeBlocks._HASH_BATCH)
+    # The error is raised rather than the worker waiting forever
+    with pytest.raises(ValueError):
+        await wait_for(target._worker(), 5)
+
+
+class FakeMempoolRest(FakeRest):
+    """
+    Fake REST client for the mempool, outpoints of txids starting with 'c' are confirmed and unspent,
+    the others spend from the transactions in `txs`.
+    """
+    # Mempool transactions by txid, only those in `mempool` are listed by get_mempool()
+    txs: Dict[str, Json] = {}
+    mempool: List[str] = []
+    # Number of get_tx calls by txid, and outpoints of each get_utxos call
+    tx_requests: Counter_t[str] = Counter()
+    utxos_requests: List[Tuple[str, ...]] = []
+
+    async def get_mempool(self, include_txs: bool = False) -> Json:
+        return {txid: {'height': 100, 'time': 1000} for txid in self.mempool}
+
+    async def get_tx(self, txid: str) -> Json:
+        self.tx_requests[txid] += 1
+        await sleep(0)
+        # A new object each time, like a real response
+        tx: Json = loads(dumps(self.txs[txid]))
+        return tx
+
+    async def get_utxos(self, *outpoints: str) -> Json:
+        self.utxos_requests.append(outpoints)
+        await sleep(0)
+        unspent = [outpoint for outpoint in outpoints if outpoint.startswith('c')]
+        return {'bitmap': ''.join('1' if outpoint in unspent else '0' for outpoint in outpoints),
+                'utxos': [{'height': 50, 'outpoint': outpoint} for outpoint in unspent]}
+
+
+class FakeMempoolTxsV3(MempoolTxsV3):
+    """
+    MempoolTxsV3 target which runs the worker in process.
+    """
+
+    def _start(self) -> None:
+        """
+        Do not start a process.
+        """
+
+
+async def get_mempool_txs(monkeypatch: pytest.MonkeyPatch, txs: Dict[str, Json], mempool: List[str]) -> Dict[str, Json]:
+    """
+    Run the MempoolTxsV3 worker against FakeMempoolRest, return the resulting transactions by txid.
+    """
+    monkeypatch.setattr('bobs.obs.targets.Rest', FakeMempoolRest)
+    monkeypatch.setattr(FakeMempoolRest, 'txs', txs)
+    monkeypatch.setattr(FakeMempoolRest, 'mempool', mempool)
+    monkeypatch.setattr(FakeMempoolRest, 'tx_requests', Counter())
+    monkeypatch.setattr(FakeMempoolRest, 'utxos_requests', [])
+    target = FakeMempoolTxsV3('')
+    await wait_for(target._worker(), 5)
+    return {tx['txid']: tx for tx in target._get_raw_candidates()}
+
+
+@pytest.mark.asyncio
+async def test_mempool_v3_parents(monkeypatch: pytest.MonkeyPatch) -> None:
+    parent = {'txid': 'p', 'vin': [], 'vout': [{'value': value, 'n': value} for value in range(3)]}
+    txs = {'p': parent,
+           'a': {'txid': 'a', 'vin': [{'txid': 'p', 'vout': 0}, {'txid': 'p', 'vout': 2}]},
+           'b': {'txid': 'b', 'vin': [{'txid': 'p', 'vout': 1}]}}
+    result = await get_mempool_txs(monkeypatch, txs, ['a', 'b'])
+    # Both transactions spend from the same parent, it's requested once
+    assert FakeMempoolRest.tx_requests == {'a': 1, 'b': 1, 'p': 1}
+    prevouts = [tx_input['prevout'] for tx_input in result['a']['vin']]
+    assert prevouts == [{'value': 0, 'n': 0, 'height': 0}, {'value': 2, 'n': 2, 'height': 0}]
+    assert result['b']['vin'][0]['prevout'] == {'value': 1, 'n': 1, 'height': 0}
+    assert result['a']['height'] == result['b']['height'] == 100
+    assert result['a']['timestamp_date'] == result['b']['timestamp_date'] == 1000
+
+
+@pytest.mark.asyncio
+async def test_mempool_v3_utxos(monkeypatch: pytest.MonkeyPatch) -> None:
+    n_inputs = MAX_GETUTXOS_OUTPOINTS + 5
+    parent = {'txid': 'p', 'vin': [], 'vout': [{'value': value, 'n': value} for value in range(n_inputs)]}
+    # Confirmed and mempool inputs mixed, so the bitmap has gaps
+    inputs = [{'txid': 'p', 'vout': i} if i % 3 == 1 else {'txid': f'c{i}', 'vout': i} for i in range(n_inputs)]
+    result = await get_mempool_txs(monkeypatch, {'p': parent, 'a': {'txid': 'a', 'vin': inputs}}, ['a'])
+    # One getutxos request per MAX_GETUTXOS_OUTPOINTS inputs
+    assert FakeMempoolRest.utxos_requests == [tuple(f"{tx_input['txid']}-{tx_input['vout']}" for tx_input in batch)
+                                              for batch in (inputs[:MAX_GETUTXOS_OUTPOINTS],
+                                                            inputs[MAX_GETUTXOS_OUTPOINTS:])]
+    assert FakeMempoolRest.tx_requests == {'a': 1, 'p': 1}
+    for i, tx_input in enumerate(result['a']['vin']):
+        if i % 3 == 1:
+            assert tx_input['prevout'] == {'value': i, 'n': i, 'height': 0}
+        else:
+            assert tx_input['prevout'] == {'height': 50, 'outpoint': f'c{i}-{i}'}